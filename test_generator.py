@@ -1,29 +1,58 @@
 import streamlit as st
-from google import genai
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
 import os
-import json
+import orjson
+import pandas as pd
 import re
+import copy
+import io
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
 from datetime import datetime
-from typing import Dict, List, Optional
-from dotenv import load_dotenv
-load_dotenv()
+from typing import Callable, Dict, List, Optional
+
+# Optional dependencies for the semantic response cache
+try:
+    import faiss
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    faiss = None
+
+# Optional dependencies for the shared Redis response cache
+try:
+    import redis
+    from redis.backoff import NoBackoff
+    from redis.retry import Retry
+except ImportError:
+    redis = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 # --- Configuration ---
 # To run this app, set your Google API key as an environment variable:
 # export GEMINI_API_KEY="YOUR_API_KEY"
         # Then run the app: streamlit run test_generator.py
 
-try:
-    api_key = os.environ.get("GEMINI_API_KEY", "")
-    if not api_key:
-        st.error("Please set your GEMINI_API_KEY environment variable.")
-        st.stop()
-    
-    client = genai.Client(api_key=api_key)
-except Exception as e:
-    st.error(f"Failed to configure Google AI. Please ensure your GEMINI_API_KEY is set. Error: {e}")
+# Only read .env when the key is not already set in the environment
+if not os.environ.get("GEMINI_API_KEY"):
+    from dotenv import load_dotenv
+    load_dotenv()
+
+if not os.environ.get("GEMINI_API_KEY"):
+    st.error("Please set your GEMINI_API_KEY environment variable.")
     st.stop()
 
+GEMINI_MODEL = 'gemini-2.5-flash'
+
 # --- Healthcare-Specific Configuration ---
 HEALTHCARE_STANDARDS = {
     "FDA": "FDA 21 CFR Part 820 (Quality System Regulation)",
@@ -37,19 +66,51 @@ HEALTHCARE_STANDARDS = {
 
 ALM_PLATFORMS = ["Jira", "Polarion", "Azure DevOps", "TestRail", "Quality Center"]
 
-# --- Enhanced Healthcare-Focused Prompts ---
+# --- Response Cache Configuration ---
+# Identical prompts are answered from cache instead of calling Gemini again:
+# in-process via st.cache_data, and across sessions via a local SQLite file,
+# or via Redis when REDIS_URL is set so that all app processes share one cache.
+RESPONSE_CACHE_TTL = 3600
+RESPONSE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "healthcare_testgen.db")
+REDIS_URL = os.environ.get("REDIS_URL", "")
+REDIS_CACHE_TTL = 7 * 24 * 3600
+REDIS_KEY_PREFIX = "healthcare_testgen:"
+# Keep lookups fast when Redis is unreachable, and use SQLite for a while
+# after a connection failure instead of waiting on Redis for every request.
+REDIS_SOCKET_TIMEOUT = 0.5
+REDIS_RETRY_AFTER = 30
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
 
-GENERATE_HEALTHCARE_SCENARIOS_PROMPT = """
-Context: You are an expert healthcare software testing specialist with deep knowledge of medical device regulations and healthcare compliance standards. Your task is to generate comprehensive test scenarios for healthcare software requirements.
+# Requirements that closely paraphrase an earlier one reuse its test scenarios
+# when the optional sentence-transformers and faiss-cpu packages are installed.
+SEMANTIC_CACHE_MODEL = "all-MiniLM-L6-v2"
+SEMANTIC_CACHE_MAX_DISTANCE = 0.15
 
-Healthcare Software Requirement:
-"{user_story}"
+# --- Request Concurrency Configuration ---
+# Gherkin scripts are generated concurrently; keep the pool small enough to
+# stay within Gemini rate limits, and retry throttled or failed requests.
+MAX_CONCURRENT_REQUESTS = 5
+MAX_REQUEST_ATTEMPTS = 4
 
-Acceptance Criteria:
-"{acceptance_criteria}"
+# --- Display Configuration ---
+STYLESHEET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "styles.css")
 
-Applicable Standards: {standards}
-Risk Level: {risk_level}
+# Syntax-highlighting a large feature file on every rerun is expensive, so only
+# this much of it is previewed unless the user asks for the full file.
+FEATURE_PREVIEW_BYTES = 8 * 1024
+
+# Generated artifacts are cached process-wide for all sessions, and every
+# generation adds new entries, so keep only the most recent few in memory.
+ARTIFACT_CACHE_MAX_ENTRIES = 32
+
+# --- Enhanced Healthcare-Focused Prompts ---
+
+# Static instructions are sent as the Gemini system instruction and variable
+# request details as the prompt, so the long instruction prefix is identical
+# across requests and can be served from the provider's prompt cache.
+
+HEALTHCARE_SCENARIOS_SYSTEM_INSTRUCTION = """
+Context: You are an expert healthcare software testing specialist with deep knowledge of medical device regulations and healthcare compliance standards. Your task is to generate comprehensive test scenarios for healthcare software requirements.
 
 Instructions:
 Generate a comprehensive JSON array of test scenarios that must include:
@@ -85,23 +146,22 @@ Requirements:
 - Each object must have: "TestScenario" (string), "Description" (string), "TestPriority" (string: "Critical", "High", "Medium", "Low"), "ComplianceStandard" (string), "RiskCategory" (string: "Patient Safety", "Data Security", "Regulatory", "Functional")
 - Ensure traceability to the original requirement
 - Include specific healthcare domain considerations
-- Address the applicable standards mentioned above
+- Address the applicable standards listed in the request
 """
 
-GENERATE_HEALTHCARE_GHERKIN_PROMPT = """
-Context: You are a senior healthcare software test automation engineer specializing in regulatory-compliant test case development. Create detailed Gherkin test scripts that ensure full traceability to requirements and compliance standards.
-
+GENERATE_HEALTHCARE_SCENARIOS_PROMPT = """
 Healthcare Software Requirement:
 "{user_story}"
 
 Acceptance Criteria:
 "{acceptance_criteria}"
 
-Test Scenario Details:
-- Scenario: {test_scenario_type}
-- Description: {test_scenario_description}
-- Compliance Standard: {compliance_standard}
-- Risk Category: {risk_category}
+Applicable Standards: {standards}
+Risk Level: {risk_level}
+"""
+
+HEALTHCARE_GHERKIN_INSTRUCTIONS = """
+Context: You are a senior healthcare software test automation engineer specializing in regulatory-compliant test case development. Create detailed Gherkin test scripts that ensure full traceability to requirements and compliance standards.
 
 Instructions:
 Generate a detailed Gherkin test case that includes:
@@ -133,33 +193,453 @@ Additional Requirements:
 - Add performance criteria for edge cases
 - Use healthcare domain terminology appropriately
 - Ensure test is automatable with clear assertions
+"""
 
+HEALTHCARE_GHERKIN_SYSTEM_INSTRUCTION = HEALTHCARE_GHERKIN_INSTRUCTIONS + """
 Format as standard Gherkin syntax without additional markup or explanations.
 """
 
+HEALTHCARE_GHERKIN_BATCH_SYSTEM_INSTRUCTION = HEALTHCARE_GHERKIN_INSTRUCTIONS + """
+Generate one such Gherkin test case for every test scenario listed in the request.
+
+Requirements:
+- Output MUST be valid JSON array without markdown formatting
+- Each object must have: "index" (integer, the index of the test scenario it implements), "gherkin" (string, the test case in standard Gherkin syntax without additional markup or explanations)
+"""
+
+GENERATE_HEALTHCARE_GHERKIN_PROMPT = """
+Healthcare Software Requirement:
+"{user_story}"
+
+Acceptance Criteria:
+"{acceptance_criteria}"
+
+Test Scenario Details:
+- Scenario: {test_scenario_type}
+- Description: {test_scenario_description}
+- Compliance Standard: {compliance_standard}
+- Risk Category: {risk_category}
+"""
+
+GENERATE_HEALTHCARE_GHERKIN_BATCH_PROMPT = """
+Healthcare Software Requirement:
+"{user_story}"
+
+Acceptance Criteria:
+"{acceptance_criteria}"
+
+Test Scenarios (JSON array):
+{test_scenarios}
+"""
+
 # --- Helper Functions ---
 
-def safe_json_loads(json_string: str) -> Optional[List[Dict]]:
+# Patterns used to clean up model responses before JSON parsing
+_RE_JSON_FENCE = re.compile(r'```json\s*')
+_RE_TRAIL_FENCE = re.compile(r'```\s*$')
+_RE_JSON_ARRAY = re.compile(r'\[.*\]', re.DOTALL)
+
+# Pattern used to strip Feature declarations from generated Gherkin scripts
+_RE_SCENARIO = re.compile(r'Scenario.*', re.DOTALL)
+
+def safe_json_loads(json_string: str, report_errors: bool = True) -> Optional[List[Dict]]:
     """Safely loads a JSON string, attempting to clean it first."""
+    # Well-formed responses parse directly without any cleanup
+    if '```' not in json_string and json_string.lstrip().startswith('['):
+        try:
+            return orjson.loads(json_string)
+        except orjson.JSONDecodeError:
+            pass
+    
     # Remove markdown code block markers if present
-    json_string = re.sub(r'```json\s*', '', json_string)
-    json_string = re.sub(r'```\s*$', '', json_string)
+    json_string = _RE_JSON_FENCE.sub('', json_string)
+    json_string = _RE_TRAIL_FENCE.sub('', json_string)
     
     # Attempt to find a JSON array within the string
-    match = re.search(r'\[.*\]', json_string, re.DOTALL)
+    match = _RE_JSON_ARRAY.search(json_string)
     if match:
         json_string = match.group(0)
     
     try:
-        return json.loads(json_string)
-    except json.JSONDecodeError as e:
-        st.error(f"AI response was not valid JSON. Error: {e}")
+        return orjson.loads(json_string)
+    except orjson.JSONDecodeError as e:
+        if report_errors:
+            st.error(f"AI response was not valid JSON. Error: {e}")
+        return None
+
+def _prompt_key(prompt: str, system_instruction: Optional[str] = None) -> str:
+    """Returns the deterministic cache key for a prompt, its system instruction and the model."""
+    return hashlib.sha256(f"{GEMINI_MODEL}\0{system_instruction or ''}\0{prompt}".encode("utf-8")).hexdigest()
+
+def _open_response_cache() -> sqlite3.Connection:
+    """Opens the persistent response cache, creating it if needed."""
+    os.makedirs(os.path.dirname(RESPONSE_CACHE_PATH), exist_ok=True)
+    conn = sqlite3.connect(RESPONSE_CACHE_PATH)
+    conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, response TEXT NOT NULL)")
+    return conn
+
+@st.cache_resource(show_spinner=False)
+def get_redis_client():
+    """Returns the shared Redis client, or None if Redis is not configured or REDIS_URL is invalid."""
+    if not REDIS_URL or redis is None:
+        return None
+    try:
+        return redis.Redis.from_url(
+            REDIS_URL,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            retry=Retry(NoBackoff(), 0)
+        )
+    except ValueError:
+        return None
+
+@st.cache_resource(show_spinner=False)
+def _redis_backoff() -> Dict[str, float]:
+    """Returns the process-wide record of when Redis may be tried again."""
+    return {"retry_at": 0.0}
+
+def _active_redis_client():
+    """Returns the Redis client, or None if it is not configured or recently unreachable."""
+    redis_client = get_redis_client()
+    if redis_client is None or time.monotonic() < _redis_backoff()["retry_at"]:
+        return None
+    return redis_client
+
+def _mark_redis_unreachable() -> None:
+    """Skips Redis, falling back to SQLite, for the next REDIS_RETRY_AFTER seconds."""
+    _redis_backoff()["retry_at"] = time.monotonic() + REDIS_RETRY_AFTER
+
+def _encode_response(response: str) -> bytes:
+    """Encodes a response for Redis, compressing it when zstandard is installed."""
+    data = response.encode("utf-8")
+    if zstandard is not None:
+        return zstandard.ZstdCompressor().compress(data)
+    return data
+
+def _decode_response(data: bytes) -> Optional[str]:
+    """Decodes a response stored in Redis, returning None if it cannot be read."""
+    # Compressed entries start with the zstd frame magic, which is never valid UTF-8
+    if data.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            return None
+        try:
+            data = zstandard.ZstdDecompressor().decompress(data)
+        except zstandard.ZstdError:
+            return None
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+def _response_cache_get(key: str) -> Optional[str]:
+    """Looks up a cached response, returning None on a miss."""
+    redis_client = _active_redis_client()
+    if redis_client is not None:
+        try:
+            data = redis_client.get(REDIS_KEY_PREFIX + key)
+        except (redis.ConnectionError, redis.TimeoutError):
+            _mark_redis_unreachable()
+        except redis.RedisError:
+            return None
+        else:
+            return _decode_response(data) if data is not None else None
+    
+    try:
+        with closing(_open_response_cache()) as conn:
+            row = conn.execute("SELECT response FROM cache WHERE key=?", (key,)).fetchone()
+    except (sqlite3.Error, OSError):
+        return None
+    return row[0] if row else None
+
+def _response_cache_put(key: str, response: str) -> None:
+    """Stores a response in the persistent cache, ignoring storage errors."""
+    redis_client = _active_redis_client()
+    if redis_client is not None:
+        try:
+            redis_client.set(REDIS_KEY_PREFIX + key, _encode_response(response), ex=REDIS_CACHE_TTL)
+            return
+        except (redis.ConnectionError, redis.TimeoutError):
+            _mark_redis_unreachable()
+        except redis.RedisError:
+            return
+    
+    try:
+        with closing(_open_response_cache()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO cache (key, response) VALUES (?, ?)", (key, response))
+    except (sqlite3.Error, OSError):
+        pass
+
+class SemanticCache:
+    """Cache that returns stored responses for texts similar to previously seen ones.
+    
+    Texts are embedded with a sentence-transformers model and compared by cosine
+    distance. Entries are grouped into namespaces that must match exactly, and
+    are persisted to SQLite so they survive restarts. Stored namespaces are
+    prefixed with the model name, so embeddings from another model are never
+    loaded. Any failure is treated as a cache miss.
+    """
+    
+    def __init__(self, model_name: str, path: str, max_distance: float):
+        self._model = SentenceTransformer(model_name)
+        self._prefix = f"{model_name}:"
+        self._path = path
+        self._max_distance = max_distance
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, "faiss.IndexFlatIP"] = {}
+        self._responses: Dict[str, List[str]] = {}
+        
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT namespace, embedding, response FROM semantic_cache WHERE substr(namespace, 1, ?) = ? ORDER BY rowid",
+                (len(self._prefix), self._prefix)
+            ).fetchall()
+        for namespace, embedding, response in rows:
+            self._add(namespace, np.frombuffer(embedding, dtype=np.float32).reshape(1, -1), response)
+    
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        conn = sqlite3.connect(self._path)
+        conn.execute("CREATE TABLE IF NOT EXISTS semantic_cache (namespace TEXT NOT NULL, embedding BLOB NOT NULL, response TEXT NOT NULL)")
+        return conn
+    
+    def _embed(self, text: str) -> "np.ndarray":
+        return self._model.encode([text], normalize_embeddings=True).astype(np.float32)
+    
+    def _add(self, namespace: str, embedding: "np.ndarray", response: str) -> None:
+        if namespace not in self._indexes:
+            self._indexes[namespace] = faiss.IndexFlatIP(embedding.shape[1])
+            self._responses[namespace] = []
+        self._indexes[namespace].add(embedding)
+        self._responses[namespace].append(response)
+    
+    def get(self, text: str, namespace: str) -> Optional[str]:
+        """Returns the response stored for the closest similar text, or None."""
+        namespace = self._prefix + namespace
+        try:
+            embedding = self._embed(text)
+            with self._lock:
+                index = self._indexes.get(namespace)
+                if index is None:
+                    return None
+                similarities, positions = index.search(embedding, 1)
+                if 1 - similarities[0][0] < self._max_distance:
+                    return self._responses[namespace][positions[0][0]]
+        except Exception:
+            return None
+        return None
+    
+    def put(self, text: str, namespace: str, response: str) -> None:
+        """Stores a response for a text, in memory and in the persistent cache."""
+        namespace = self._prefix + namespace
+        try:
+            embedding = self._embed(text)
+            with self._lock:
+                self._add(namespace, embedding, response)
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT INTO semantic_cache (namespace, embedding, response) VALUES (?, ?, ?)",
+                    (namespace, embedding.tobytes(), response)
+                )
+        except Exception:
+            pass
+
+@st.cache_resource(show_spinner=False)
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Returns the shared semantic cache, or None if it is not installed or fails to load."""
+    if faiss is None:
+        return None
+    try:
+        return SemanticCache(SEMANTIC_CACHE_MODEL, RESPONSE_CACHE_PATH, SEMANTIC_CACHE_MAX_DISTANCE)
+    except Exception:
         return None
 
+@st.cache_resource(show_spinner=False)
+def get_genai_client():
+    """Returns the Gemini client shared by all sessions in this process."""
+    from google import genai
+    return genai.Client(api_key=os.environ["GEMINI_API_KEY"])
+
+def _is_retryable_error(error: BaseException) -> bool:
+    """Returns True for rate-limit and server-side API errors."""
+    from google.genai import errors as genai_errors
+    return isinstance(error, genai_errors.APIError) and (error.code == 429 or error.code >= 500)
+
+@retry(
+    retry=retry_if_exception(_is_retryable_error),
+    stop=stop_after_attempt(MAX_REQUEST_ATTEMPTS),
+    wait=wait_exponential(multiplier=1, max=20),
+    reraise=True
+)
+def _request_content(prompt: str, system_instruction: Optional[str] = None) -> str:
+    """Calls the Gemini API and returns the response text."""
+    response = get_genai_client().models.generate_content(
+        model=GEMINI_MODEL,
+        contents=prompt,
+        config={'system_instruction': system_instruction} if system_instruction else None
+    )
+    return response.text or ""
+
+@retry(
+    retry=retry_if_exception(_is_retryable_error),
+    stop=stop_after_attempt(MAX_REQUEST_ATTEMPTS),
+    wait=wait_exponential(multiplier=1, max=20),
+    reraise=True
+)
+def _stream_content(prompt: str, system_instruction: Optional[str], on_chunk: Callable[[str], None]) -> str:
+    """Streams a Gemini API response, passing each chunk of text to on_chunk as it arrives."""
+    chunks = []
+    for chunk in get_genai_client().models.generate_content_stream(
+        model=GEMINI_MODEL,
+        contents=prompt,
+        config={'system_instruction': system_instruction} if system_instruction else None
+    ):
+        if chunk.text:
+            chunks.append(chunk.text)
+            on_chunk(chunk.text)
+    return "".join(chunks)
+
+class _CacheMiss(Exception):
+    """Raised by _cached_response so that cache misses are never memoized."""
+
+@st.cache_data(ttl=RESPONSE_CACHE_TTL, show_spinner=False)
+def _cached_response(key: str) -> str:
+    """Returns a response from the persistent cache, memoized in-process."""
+    cached = _response_cache_get(key)
+    if cached is None:
+        raise _CacheMiss(key)
+    return cached
+
+def generate_content(prompt: str, system_instruction: Optional[str] = None, refresh: bool = False,
+                     on_chunk: Optional[Callable[[str], None]] = None,
+                     validate: Callable[[str], bool] = bool) -> str:
+    """Returns the Gemini response for a prompt, bypassing cached responses when refresh is set.
+    
+    Fresh responses are cached only if they are non-empty and pass validate, so
+    an unusable reply is requested again next time instead of being replayed.
+    When on_chunk is given, fresh responses are streamed and on_chunk is called
+    with each chunk of text as it arrives.
+    """
+    key = _prompt_key(prompt, system_instruction)
+    if not refresh:
+        try:
+            return _cached_response(key)
+        except _CacheMiss:
+            pass
+    
+    if on_chunk is None:
+        text = _request_content(prompt, system_instruction)
+    else:
+        text = _stream_content(prompt, system_instruction, on_chunk)
+    
+    if text and validate(text):
+        _response_cache_put(key, text)
+        # Drop any in-process copy of the response this one replaces
+        _cached_response.clear(key)
+    return text
+
 def generate_traceability_id() -> str:
     """Generate a unique traceability ID for requirements tracking."""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return f"REQ_{timestamp}"
+    # Nanosecond resolution keeps IDs unique across concurrent sessions
+    return f"REQ_{time.time_ns()}"
+
+@st.cache_resource(show_spinner=False)
+def load_stylesheet(path: str) -> str:
+    """Reads a CSS file once and wraps it in a style tag for st.markdown."""
+    with open(path, encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
+
+@st.cache_data(ttl=RESPONSE_CACHE_TTL, max_entries=ARTIFACT_CACHE_MAX_ENTRIES, show_spinner=False)
+def build_traceability_matrix(traceability_id: str, user_story: str, acceptance_criteria: str,
+                              standards: tuple, risk_level: str, scenarios: List[Dict],
+                              generated_at: datetime) -> bytes:
+    """Builds the JSON traceability matrix linking the requirement to its selected scenarios."""
+    traceability_matrix = {
+        "requirement_id": traceability_id,
+        "requirement": user_story,
+        "acceptance_criteria": acceptance_criteria,
+        "compliance_standards": list(standards),
+        "risk_level": risk_level,
+        "generated_scenarios": [
+            {
+                "scenario_name": s.get('TestScenario'),
+                "description": s.get('Description'),
+                "priority": s.get('TestPriority'),
+                "compliance_standard": s.get('ComplianceStandard'),
+                "risk_category": s.get('RiskCategory')
+            }
+            for s in scenarios
+        ],
+        "generation_timestamp": generated_at.isoformat()
+    }
+    return orjson.dumps(traceability_matrix, option=orjson.OPT_INDENT_2)
+
+@st.cache_data(ttl=RESPONSE_CACHE_TTL, max_entries=ARTIFACT_CACHE_MAX_ENTRIES, show_spinner=False)
+def build_feature_file(traceability_id: str, user_story: str, standards: tuple, risk_level: str,
+                       target_platform: str, gherkin_scripts: tuple, generated_at: datetime) -> bytes:
+    """Combines the generated Gherkin scripts into a single UTF-8 encoded feature file."""
+    feature_header = f"""# Traceability ID: {traceability_id}
+# Generated: {generated_at.strftime('%Y-%m-%d %H:%M:%S')}
+# Compliance Standards: {', '.join(standards)}
+# Risk Level: {risk_level}
+# Target Platform: {target_platform}
+
+Feature: Healthcare Test Suite - {user_story[:100]}...
+  
+  Background:
+    Given the healthcare system is operational and compliant
+    And audit logging is enabled for all user actions
+    And user authentication and authorization systems are active
+
+"""
+    
+    # Combine all scenarios
+    buffer = io.BytesIO()
+    buffer.write(feature_header.encode("utf-8"))
+    for idx, scenario_content in enumerate(gherkin_scripts):
+        if idx:
+            buffer.write(b"\n\n")
+        # Extract scenario content (remove Feature line if present)
+        scenario_match = _RE_SCENARIO.search(scenario_content)
+        if scenario_match:
+            scenario_content = scenario_match.group(0)
+        buffer.write(scenario_content.encode("utf-8"))
+    
+    return buffer.getvalue()
+
+@st.cache_data(ttl=RESPONSE_CACHE_TTL, max_entries=ARTIFACT_CACHE_MAX_ENTRIES, show_spinner=False)
+def build_summary_report(traceability_id: str, user_story: str, standards: tuple, risk_level: str,
+                         target_platform: str, total_scenarios: int, selected_scenarios: List[Dict],
+                         generated_at: datetime) -> str:
+    """Builds the markdown summary report for the generated test assets."""
+    priority_counts = Counter(s.get('TestPriority') for s in selected_scenarios)
+    risk_counts = Counter(s.get('RiskCategory') for s in selected_scenarios)
+    return f"""# Healthcare Test Generation Summary Report
+
+**Traceability ID:** {traceability_id}
+**Generated:** {generated_at.strftime('%Y-%m-%d %H:%M:%S')}
+
+## Requirement Details
+- **User Story:** {user_story}
+- **Compliance Standards:** {', '.join(standards)}
+- **Risk Level:** {risk_level}
+- **Target ALM Platform:** {target_platform}
+
+## Test Coverage Summary
+- **Total Scenarios Generated:** {total_scenarios}
+- **Scenarios Selected for Implementation:** {len(selected_scenarios)}
+- **Critical Priority Tests:** {priority_counts['Critical']}
+- **Patient Safety Tests:** {risk_counts['Patient Safety']}
+
+## Compliance Verification
+✅ Regulatory standards addressed
+✅ Audit trail requirements included  
+✅ Data privacy considerations implemented
+✅ Traceability established
+✅ Risk-based testing approach applied
+
+---
+*Generated by Healthcare AI Test Generator - Powered by Google Gemini*
+"""
 
 def generate_healthcare_test_scenarios(_user_story: str, _acceptance_criteria: str, 
                                      _standards: List[str], _risk_level: str) -> Dict:
@@ -167,7 +647,8 @@ def generate_healthcare_test_scenarios(_user_story: str, _acceptance_criteria: s
     if not _user_story:
         return {"error": "Healthcare requirement cannot be empty."}
     
-    standards_text = ", ".join([HEALTHCARE_STANDARDS.get(std, std) for std in _standards])
+    # Sorted so the same standards always produce the same prompt and cache key
+    standards_text = ", ".join([HEALTHCARE_STANDARDS.get(std, std) for std in sorted(_standards)])
     
     prompt = GENERATE_HEALTHCARE_SCENARIOS_PROMPT.format(
         user_story=_user_story,
@@ -176,12 +657,23 @@ def generate_healthcare_test_scenarios(_user_story: str, _acceptance_criteria: s
         risk_level=_risk_level
     )
     
+    # Paraphrased requirements only match when standards and risk level are identical
+    semantic_cache = get_semantic_cache()
+    semantic_text = f"{_user_story}\n{_acceptance_criteria}"
+    semantic_namespace = _prompt_key(f"{standards_text}\n{_risk_level}", HEALTHCARE_SCENARIOS_SYSTEM_INSTRUCTION)
+    
     try:
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=prompt
-        )
-        scenarios = safe_json_loads(response.text)
+        response = semantic_cache.get(semantic_text, semantic_namespace) if semantic_cache else None
+        from_semantic_cache = response is not None
+        if not from_semantic_cache:
+            response = generate_content(
+                prompt,
+                HEALTHCARE_SCENARIOS_SYSTEM_INSTRUCTION,
+                validate=lambda text: bool(safe_json_loads(text, report_errors=False))
+            )
+        scenarios = safe_json_loads(response)
+        if scenarios and semantic_cache and not from_semantic_cache:
+            semantic_cache.put(semantic_text, semantic_namespace, response)
         if scenarios:
             return {"success": True, "scenarios": scenarios}
         else:
@@ -189,11 +681,9 @@ def generate_healthcare_test_scenarios(_user_story: str, _acceptance_criteria: s
     except Exception as e:
         return {"error": f"An error occurred with the AI model: {e}"}
 
-def generate_healthcare_gherkin_script(_user_story: str, _acceptance_criteria: str, _scenario: Dict, _timestamp: Optional[str] = None) -> str:
+def generate_healthcare_gherkin_script(_user_story: str, _acceptance_criteria: str, _scenario: Dict, _refresh: bool = False,
+                                      _on_chunk: Optional[Callable[[str], None]] = None) -> str:
     """Calls the Gemini API to generate a healthcare-compliant Gherkin script."""
-    # Add timestamp to ensure fresh generation when needed
-    current_time = _timestamp or datetime.now().isoformat()
-    
     prompt = GENERATE_HEALTHCARE_GHERKIN_PROMPT.format(
         user_story=_user_story,
         acceptance_criteria=_acceptance_criteria,
@@ -204,14 +694,91 @@ def generate_healthcare_gherkin_script(_user_story: str, _acceptance_criteria: s
     )
     
     try:
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=prompt
-        )
-        return response.text
+        return generate_content(prompt, HEALTHCARE_GHERKIN_SYSTEM_INSTRUCTION, refresh=_refresh, on_chunk=_on_chunk)
     except Exception as e:
         return f"Error generating Gherkin script: {e}"
 
+def _parse_gherkin_batch(response: str, count: int) -> List[Optional[str]]:
+    """Maps a batched Gherkin reply back to scenario order, with None for missing scenarios."""
+    scripts: List[Optional[str]] = [None] * count
+    for entry in safe_json_loads(response, report_errors=False) or []:
+        if not isinstance(entry, dict):
+            continue
+        idx, gherkin = entry.get("index"), entry.get("gherkin")
+        if isinstance(idx, int) and 0 <= idx < count and isinstance(gherkin, str) and gherkin:
+            scripts[idx] = gherkin
+    return scripts
+
+def generate_healthcare_gherkin_batch(_user_story: str, _acceptance_criteria: str, _scenarios: List[Dict], _refresh: bool = False,
+                                     _on_chunk: Optional[Callable[[str], None]] = None) -> Dict:
+    """Calls the Gemini API once to generate Gherkin scripts for several scenarios.
+    
+    On success, "scripts" holds one script per scenario, in order, with None for
+    any scenario the reply did not cover so callers can fall back to
+    per-scenario generation. API errors are returned as "error" instead, since
+    retrying them once per scenario would only multiply the failing requests.
+    """
+    test_scenarios = [
+        {
+            "index": idx,
+            "TestScenario": scenario.get("TestScenario", "N/A"),
+            "Description": scenario.get("Description", "N/A"),
+            "ComplianceStandard": scenario.get("ComplianceStandard", "General"),
+            "RiskCategory": scenario.get("RiskCategory", "Functional")
+        }
+        for idx, scenario in enumerate(_scenarios)
+    ]
+    
+    prompt = GENERATE_HEALTHCARE_GHERKIN_BATCH_PROMPT.format(
+        user_story=_user_story,
+        acceptance_criteria=_acceptance_criteria,
+        test_scenarios=orjson.dumps(test_scenarios, option=orjson.OPT_INDENT_2).decode()
+    )
+    
+    try:
+        response = generate_content(
+            prompt,
+            HEALTHCARE_GHERKIN_BATCH_SYSTEM_INSTRUCTION,
+            refresh=_refresh,
+            on_chunk=_on_chunk,
+            # Only cache replies that cover every scenario
+            validate=lambda text: None not in _parse_gherkin_batch(text, len(_scenarios))
+        )
+    except Exception as e:
+        return {"error": f"An error occurred with the AI model: {e}"}
+    return {"success": True, "scripts": _parse_gherkin_batch(response, len(_scenarios))}
+
+def stream_preview(placeholder, language: str) -> Callable[[str], None]:
+    """Returns an on_chunk callback that shows the tail of a streaming reply in a placeholder.
+    
+    Only the last FEATURE_PREVIEW_BYTES characters are kept and rendered, so the
+    cost of each update does not grow with the size of the reply.
+    """
+    tail = ""
+    
+    def on_chunk(chunk: str) -> None:
+        nonlocal tail
+        tail = (tail + chunk)[-FEATURE_PREVIEW_BYTES:]
+        placeholder.code(tail, language=language)
+    
+    return on_chunk
+
+def batch_stream_progress(placeholder, total: int) -> Callable[[str], None]:
+    """Returns an on_chunk callback that reports how many scripts of a batched reply have started arriving."""
+    key = '"gherkin"'
+    carry = ""
+    started = 0
+    
+    def on_chunk(chunk: str) -> None:
+        nonlocal carry, started
+        # Carry the end of the previous chunk so a key split across chunks is still counted once
+        text = carry + chunk
+        started += text.count(key)
+        carry = text[-(len(key) - 1):]
+        placeholder.caption(f"Receiving test script {max(1, min(started, total))} of {total}...")
+    
+    return on_chunk
+
 # --- Streamlit UI ---
 
 st.set_page_config(
@@ -220,31 +787,8 @@ st.set_page_config(
     page_icon="🏥"
 )
 
-# Custom CSS for healthcare theme
-st.markdown("""
-<style>
-    .healthcare-header {
-        background: linear-gradient(90deg, #0066cc, #004499);
-        color: white;
-        padding: 1rem;
-        border-radius: 10px;
-        margin-bottom: 2rem;
-    }
-    .compliance-badge {
-        background-color: #e8f4fd;
-        border: 1px solid #0066cc;
-        border-radius: 15px;
-        padding: 0.3rem 0.8rem;
-        margin: 0.2rem;
-        display: inline-block;
-        font-size: 0.8rem;
-    }
-    .risk-critical { background-color: #ffebee; border-color: #f44336; }
-    .risk-high { background-color: #fff3e0; border-color: #ff9800; }
-    .risk-medium { background-color: #f3e5f5; border-color: #9c27b0; }
-    .risk-low { background-color: #e8f5e8; border-color: #4caf50; }
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS for healthcare theme (must be re-emitted on every rerun to stay applied)
+st.markdown(load_stylesheet(STYLESHEET_PATH), unsafe_allow_html=True)
 
 # Header
 st.markdown("""
@@ -254,7 +798,8 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-st.markdown("""
+with st.expander("Workflow Overview", expanded=False):
+    st.markdown("""
 **Regulatory Compliance**: FDA 21 CFR Part 820, IEC 62304, ISO 13485, ISO 27001, HIPAA, GDPR  
 **Integration Ready**: Jira, Polarion, Azure DevOps, TestRail  
 **Powered by**: Google Gemini AI
@@ -268,22 +813,21 @@ st.markdown("""
 """)
 
 # --- State Management ---
-if 'current_step' not in st.session_state:
-    st.session_state.current_step = 1
-if 'scenarios' not in st.session_state:
-    st.session_state.scenarios = []
-if 'selected_scenarios' not in st.session_state:
-    st.session_state.selected_scenarios = []
-if 'generated_scripts' not in st.session_state:
-    st.session_state.generated_scripts = []
-if 'scenarios_generation_id' not in st.session_state:
-    st.session_state.scenarios_generation_id = 0
-if 'user_story' not in st.session_state:
-    st.session_state.user_story = ""
-if 'acceptance_criteria' not in st.session_state:
-    st.session_state.acceptance_criteria = ""
-if 'traceability_id' not in st.session_state:
-    st.session_state.traceability_id = generate_traceability_id()
+SESSION_STATE_DEFAULTS = {
+    'current_step': 1,
+    'scenarios': [],
+    'selected_scenarios': [],
+    'generated_scripts': [],
+    'scenarios_generation_id': 0,
+    'user_story': "",
+    'acceptance_criteria': "",
+    'traceability_id': None,  # Assigned when requirements are submitted
+    'refresh_scripts': False,
+    'generation_timestamp': None  # Set when test scripts are generated
+}
+for key, value in SESSION_STATE_DEFAULTS.items():
+    # Copy so sessions never share the mutable default lists
+    st.session_state.setdefault(key, copy.copy(value))
 
 # --- Step 1: Input Healthcare Requirements ---
 st.header("Step 1: Define Healthcare Software Requirements")
@@ -352,7 +896,7 @@ with col1:
                 st.session_state.current_step = 2
                 st.session_state.selected_scenarios = []
                 st.session_state.generated_scripts = []  # Clear any existing generated scripts
-                st.session_state.scenarios_generation_id += 1  # Increment to reset checkbox selections
+                st.session_state.scenarios_generation_id += 1  # Increment to reset scenario selections
                 st.rerun()
             else:
                 st.error(result.get("error", "An unknown error occurred."))
@@ -362,50 +906,45 @@ if st.session_state.current_step >= 2 and st.session_state.scenarios:
     st.header("Step 2: Review Healthcare Test Scenarios")
     
     # Summary metrics
+    priority_counts = Counter(s.get('TestPriority') for s in st.session_state.scenarios)
+    risk_counts = Counter(s.get('RiskCategory') for s in st.session_state.scenarios)
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.metric("Total Scenarios", len(st.session_state.scenarios))
     with col2:
-        critical_count = sum(1 for s in st.session_state.scenarios if s.get('TestPriority') == 'Critical')
-        st.metric("Critical Priority", critical_count)
+        st.metric("Critical Priority", priority_counts['Critical'])
     with col3:
-        patient_safety_count = sum(1 for s in st.session_state.scenarios if s.get('RiskCategory') == 'Patient Safety')
-        st.metric("Patient Safety", patient_safety_count)
+        st.metric("Patient Safety", risk_counts['Patient Safety'])
     with col4:
         st.metric("Traceability ID", st.session_state.traceability_id)
     
     st.subheader("Select Test Scenarios for Implementation")
     
-    selected_indices = []
-    for i, scenario in enumerate(st.session_state.scenarios):
-        with st.container():
-            cols = st.columns([0.05, 0.25, 0.45, 0.1, 0.1, 0.05])
-            
-            with cols[0]:
-                if st.checkbox("", key=f"select_{i}_{st.session_state.scenarios_generation_id}"):
-                    selected_indices.append(i)
-            
-            with cols[1]:
-                st.markdown(f"**{scenario.get('TestScenario', 'N/A')}**")
-                
-                # Compliance badge
-                compliance = scenario.get('ComplianceStandard', 'General')
-                st.markdown(f'<span class="compliance-badge">{compliance}</span>', unsafe_allow_html=True)
-            
-            with cols[2]:
-                st.markdown(scenario.get('Description', 'No description provided.'))
-            
-            with cols[3]:
-                priority = scenario.get('TestPriority', 'Medium')
-                risk_class = f"risk-{priority.lower()}"
-                st.markdown(f'<span class="compliance-badge {risk_class}">{priority}</span>', unsafe_allow_html=True)
-            
-            with cols[4]:
-                risk_category = scenario.get('RiskCategory', 'Functional')
-                st.markdown(f"**{risk_category}**")
-            
-            with cols[5]:
-                st.markdown("📋")
+    # Render all scenarios as a single editable table with a selection column
+    scenarios_table = pd.DataFrame({
+        "Select": False,
+        "TestScenario": [s.get('TestScenario', 'N/A') for s in st.session_state.scenarios],
+        "Description": [s.get('Description', 'No description provided.') for s in st.session_state.scenarios],
+        "ComplianceStandard": [s.get('ComplianceStandard', 'General') for s in st.session_state.scenarios],
+        "TestPriority": [s.get('TestPriority', 'Medium') for s in st.session_state.scenarios],
+        "RiskCategory": [s.get('RiskCategory', 'Functional') for s in st.session_state.scenarios]
+    })
+    
+    edited_table = st.data_editor(
+        scenarios_table,
+        column_config={
+            "Select": st.column_config.CheckboxColumn("Select", width="small"),
+            "TestScenario": st.column_config.TextColumn("Test Scenario"),
+            "Description": st.column_config.TextColumn("Description", width="large"),
+            "ComplianceStandard": st.column_config.TextColumn("Compliance Standard"),
+            "TestPriority": st.column_config.TextColumn("Priority"),
+            "RiskCategory": st.column_config.TextColumn("Risk Category")
+        },
+        disabled=["TestScenario", "Description", "ComplianceStandard", "TestPriority", "RiskCategory"],
+        hide_index=True,
+        key=f"scenario_selection_{st.session_state.scenarios_generation_id}"
+    )
+    selected_indices = edited_table.index[edited_table["Select"]].tolist()
     
     # Update selected scenarios
     st.session_state.selected_scenarios = [st.session_state.scenarios[i] for i in selected_indices]
@@ -425,6 +964,7 @@ if st.session_state.current_step >= 2 and st.session_state.scenarios:
             if st.session_state.current_step >= 3 and st.session_state.generated_scripts:
                 if st.button("🔄 Regenerate Test Scripts", type="secondary", key="regenerate_scripts"):
                     st.session_state.generated_scripts = []  # Clear existing scripts to trigger regeneration
+                    st.session_state.refresh_scripts = True  # Bypass cached responses for this generation
                     st.rerun()
 
 # --- Step 3: Generate Healthcare-Compliant Gherkin Scripts ---
@@ -435,62 +975,89 @@ if st.session_state.current_step >= 3 and st.session_state.selected_scenarios:
     if not st.session_state.generated_scripts:
         st.info("🔄 Generating healthcare-compliant test scripts...")
         
-        all_gherkin_scripts = []
+        selected = st.session_state.selected_scenarios
         progress_bar = st.progress(0)
-        generation_timestamp = datetime.now().isoformat()  # Unique timestamp for this generation
         
-        for idx, scenario in enumerate(st.session_state.selected_scenarios):
-            progress_bar.progress((idx + 1) / len(st.session_state.selected_scenarios))
+        # Generate all scripts in a single request, showing progress as the response streams in
+        live_preview = st.empty()
+        result = generate_healthcare_gherkin_batch(
+            st.session_state.user_story,
+            st.session_state.acceptance_criteria,
+            selected,
+            st.session_state.refresh_scripts,
+            batch_stream_progress(live_preview, len(selected))
+        )
+        live_preview.empty()
+        
+        if not result.get("success"):
+            progress_bar.empty()
+            st.error(result.get("error", "An unknown error occurred."))
+            # Return to Step 2 so the failed generation is not retried on every rerun
+            st.session_state.current_step = 2
+            st.stop()
+        
+        gherkin_scripts = result["scripts"]
+        missing = [idx for idx, gherkin_script in enumerate(gherkin_scripts) if gherkin_script is None]
+        progress_bar.progress((len(selected) - len(missing)) / len(selected))
+        
+        # Fall back to concurrent per-scenario requests for anything the batch missed
+        if missing:
+            live_previews = {idx: st.empty() for idx in missing}
+            # Worker threads need the script run context to update their previews
+            with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS, initializer=add_script_run_ctx,
+                                    initargs=(None, get_script_run_ctx())) as executor:
+                futures = {
+                    executor.submit(
+                        generate_healthcare_gherkin_script,
+                        st.session_state.user_story,
+                        st.session_state.acceptance_criteria,
+                        selected[idx],
+                        st.session_state.refresh_scripts,
+                        stream_preview(live_previews[idx], "gherkin")
+                    ): idx
+                    for idx in missing
+                }
+                # Progress is reported from the main thread as requests complete
+                for future in as_completed(futures):
+                    gherkin_scripts[futures[future]] = future.result()
+                    progress_bar.progress(sum(1 for g in gherkin_scripts if g is not None) / len(selected))
             
-            gherkin_script = generate_healthcare_gherkin_script(
-                st.session_state.user_story,
-                st.session_state.acceptance_criteria,
-                scenario,
-                generation_timestamp  # Pass timestamp to ensure unique generation
-            )
-            all_gherkin_scripts.append({
-                'scenario': scenario,
-                'gherkin': gherkin_script
-            })
+            for preview in live_previews.values():
+                preview.empty()
+        
+        all_gherkin_scripts = [
+            {'scenario': scenario, 'gherkin': gherkin_script}
+            for scenario, gherkin_script in zip(selected, gherkin_scripts)
+        ]
         
         progress_bar.empty()
         st.session_state.generated_scripts = all_gherkin_scripts
+        # One timestamp per generation keeps the downstream artifacts, and their cache keys, stable across reruns
+        st.session_state.generation_timestamp = datetime.now()
+        st.session_state.refresh_scripts = False
         st.success("✅ Test scripts generated successfully!")
     else:
         all_gherkin_scripts = st.session_state.generated_scripts
     
     # Create comprehensive feature file
-    feature_header = f"""# Traceability ID: {st.session_state.traceability_id}
-# Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-# Compliance Standards: {', '.join(selected_standards)}
-# Risk Level: {risk_level}
-# Target Platform: {target_platform}
-
-Feature: Healthcare Test Suite - {st.session_state.user_story[:100]}...
-  
-  Background:
-    Given the healthcare system is operational and compliant
-    And audit logging is enabled for all user actions
-    And user authentication and authorization systems are active
-
-"""
-    
-    # Combine all scenarios
-    combined_scenarios = []
-    for script_data in all_gherkin_scripts:
-        scenario_content = script_data['gherkin']
-        # Extract scenario content (remove Feature line if present)
-        scenario_match = re.search(r'Scenario.*', scenario_content, re.DOTALL)
-        if scenario_match:
-            combined_scenarios.append(scenario_match.group(0))
-        else:
-            combined_scenarios.append(scenario_content)
-    
-    final_feature_file = feature_header + "\n\n".join(combined_scenarios)
+    final_feature_file = build_feature_file(
+        st.session_state.traceability_id,
+        st.session_state.user_story,
+        tuple(selected_standards),
+        risk_level,
+        target_platform,
+        tuple(script_data['gherkin'] for script_data in all_gherkin_scripts),
+        st.session_state.generation_timestamp
+    )
     
     # Display the generated content
     st.subheader("Complete Feature File")
-    st.code(final_feature_file, language="gherkin")
+    if len(final_feature_file) > FEATURE_PREVIEW_BYTES and not st.toggle("Show full feature file", key="show_full_feature_file"):
+        preview = final_feature_file[:FEATURE_PREVIEW_BYTES].decode("utf-8", errors="ignore")
+        st.code(preview, language="gherkin")
+        st.caption(f"Showing the first {FEATURE_PREVIEW_BYTES // 1024} KB of {len(final_feature_file) // 1024} KB. Download the .feature file for the complete suite.")
+    else:
+        st.code(final_feature_file.decode("utf-8"), language="gherkin")
     
     # Download options
     col1, col2, col3 = st.columns(3)
@@ -506,61 +1073,35 @@ Feature: Healthcare Test Suite - {st.session_state.user_story[:100]}...
     
     with col2:
         # Generate traceability matrix
-        traceability_matrix = {
-            "requirement_id": st.session_state.traceability_id,
-            "requirement": st.session_state.user_story,
-            "acceptance_criteria": st.session_state.acceptance_criteria,
-            "compliance_standards": selected_standards,
-            "risk_level": risk_level,
-            "generated_scenarios": [
-                {
-                    "scenario_name": s.get('TestScenario'),
-                    "description": s.get('Description'),
-                    "priority": s.get('TestPriority'),
-                    "compliance_standard": s.get('ComplianceStandard'),
-                    "risk_category": s.get('RiskCategory')
-                }
-                for s in st.session_state.selected_scenarios
-            ],
-            "generation_timestamp": datetime.now().isoformat()
-        }
+        traceability_matrix = build_traceability_matrix(
+            st.session_state.traceability_id,
+            st.session_state.user_story,
+            st.session_state.acceptance_criteria,
+            tuple(selected_standards),
+            risk_level,
+            st.session_state.selected_scenarios,
+            st.session_state.generation_timestamp
+        )
         
         st.download_button(
             label="📊 Download Traceability Matrix",
-            data=json.dumps(traceability_matrix, indent=2),
+            data=traceability_matrix,
             file_name=f"traceability_matrix_{st.session_state.traceability_id}.json",
             mime="application/json"
         )
     
     with col3:
         # Generate summary report
-        summary_report = f"""# Healthcare Test Generation Summary Report
-
-**Traceability ID:** {st.session_state.traceability_id}
-**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-## Requirement Details
-- **User Story:** {st.session_state.user_story}
-- **Compliance Standards:** {', '.join(selected_standards)}
-- **Risk Level:** {risk_level}
-- **Target ALM Platform:** {target_platform}
-
-## Test Coverage Summary
-- **Total Scenarios Generated:** {len(st.session_state.scenarios)}
-- **Scenarios Selected for Implementation:** {len(st.session_state.selected_scenarios)}
-- **Critical Priority Tests:** {sum(1 for s in st.session_state.selected_scenarios if s.get('TestPriority') == 'Critical')}
-- **Patient Safety Tests:** {sum(1 for s in st.session_state.selected_scenarios if s.get('RiskCategory') == 'Patient Safety')}
-
-## Compliance Verification
-✅ Regulatory standards addressed
-✅ Audit trail requirements included  
-✅ Data privacy considerations implemented
-✅ Traceability established
-✅ Risk-based testing approach applied
-
----
-*Generated by Healthcare AI Test Generator - Powered by Google Gemini*
-"""
+        summary_report = build_summary_report(
+            st.session_state.traceability_id,
+            st.session_state.user_story,
+            tuple(selected_standards),
+            risk_level,
+            target_platform,
+            len(st.session_state.scenarios),
+            st.session_state.selected_scenarios,
+            st.session_state.generation_timestamp
+        )
         
         st.download_button(
             label="📋 Download Summary Report",